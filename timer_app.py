@@ -1,51 +1,50 @@
 import tkinter as tk
 from tkinter import messagebox
-from dataclasses import dataclass
-from enum import Enum
-from time import perf_counter
+from functools import lru_cache, partial
+from time import perf_counter_ns
+from typing import NamedTuple
 
 
-class TimerMode(str, Enum):
+class TimerMode:
     UP = "正向计时"
     DOWN = "倒计时"
 
 
-class TimerState(str, Enum):
+class TimerState:
     IDLE = "idle"
     RUNNING = "running"
     PAUSED = "paused"
     FINISHED = "finished"
 
 
-@dataclass
-class TimerSnapshot:
-    mode: TimerMode
-    state: TimerState
+class TimerSnapshot(NamedTuple):
+    mode: str
+    state: str
     elapsed_seconds: float
     remaining_seconds: float | None
 
 
 class TimerModel:
     def __init__(self) -> None:
-        self._mode: TimerMode = TimerMode.UP
-        self._state: TimerState = TimerState.IDLE
+        self._mode: str = TimerMode.UP
+        self._state: str = TimerState.IDLE
         self._target_seconds: int = 5 * 60
-        self._start_perf: float | None = None
-        self._accumulated_elapsed: float = 0.0
+        self._start_perf_ns: int | None = None
+        self._accumulated_elapsed_ns: int = 0
 
     @property
-    def mode(self) -> TimerMode:
+    def mode(self) -> str:
         return self._mode
 
     @property
-    def state(self) -> TimerState:
+    def state(self) -> str:
         return self._state
 
     @property
     def target_seconds(self) -> int:
         return self._target_seconds
 
-    def set_mode(self, mode: TimerMode) -> None:
+    def set_mode(self, mode: str) -> None:
         if mode == self._mode:
             return
         self._mode = mode
@@ -55,39 +54,38 @@ class TimerModel:
         seconds = max(0, int(seconds))
         self._target_seconds = seconds
         if self._mode == TimerMode.DOWN and self._state in (TimerState.IDLE, TimerState.FINISHED):
-            self._accumulated_elapsed = 0.0
+            self._accumulated_elapsed_ns = 0
 
-    def start(self, now: float) -> None:
+    def start(self, now: int) -> None:
         if self._state == TimerState.RUNNING:
             return
         if self._state in (TimerState.IDLE, TimerState.FINISHED):
-            self._accumulated_elapsed = 0.0
-        self._start_perf = now
+            self._accumulated_elapsed_ns = 0
+        self._start_perf_ns = now
         self._state = TimerState.RUNNING
 
-    def pause(self, now: float) -> None:
+    def pause(self, now: int) -> None:
         if self._state != TimerState.RUNNING:
             return
-        if self._start_perf is not None:
-            self._accumulated_elapsed += now - self._start_perf
-        self._start_perf = None
+        if self._start_perf_ns is not None:
+            self._accumulated_elapsed_ns += now - self._start_perf_ns
+        self._start_perf_ns = None
         self._state = TimerState.PAUSED
 
-    def resume(self, now: float) -> None:
+    def resume(self, now: int) -> None:
         if self._state != TimerState.PAUSED:
             return
-        self._start_perf = now
+        self._start_perf_ns = now
         self._state = TimerState.RUNNING
 
     def reset(self) -> None:
         self._state = TimerState.IDLE
-        self._start_perf = None
-        self._accumulated_elapsed = 0.0
+        self._start_perf_ns = None
+        self._accumulated_elapsed_ns = 0
 
-    def snapshot(self, now: float) -> TimerSnapshot:
-        elapsed = self._accumulated_elapsed
-        if self._state == TimerState.RUNNING and self._start_perf is not None:
-            elapsed += now - self._start_perf
+    def snapshot(self, now: int) -> TimerSnapshot:
+        elapsed_ns = self._elapsed_ns(now)
+        elapsed = elapsed_ns / 1_000_000_000
 
         if self._mode == TimerMode.UP:
             return TimerSnapshot(
@@ -97,12 +95,7 @@ class TimerModel:
                 remaining_seconds=None,
             )
 
-        remaining = self._target_seconds - elapsed
-        if remaining <= 0:
-            remaining = 0.0
-            if self._state == TimerState.RUNNING:
-                self._state = TimerState.FINISHED
-                self._start_perf = None
+        remaining = self._countdown_remaining(elapsed_ns)
         return TimerSnapshot(
             mode=self._mode,
             state=self._state,
@@ -110,39 +103,94 @@ class TimerModel:
             remaining_seconds=remaining,
         )
 
+    def tick_display(self, now: int) -> tuple[str, str, float]:
+        elapsed_ns = self._elapsed_ns(now)
+        if self._mode == TimerMode.UP:
+            return self._mode, self._state, elapsed_ns / 1_000_000_000
+        remaining = self._countdown_remaining(elapsed_ns)
+        return self._mode, self._state, remaining
+
+    def _elapsed_ns(self, now: int) -> int:
+        elapsed_ns = self._accumulated_elapsed_ns
+        if self._state == TimerState.RUNNING and self._start_perf_ns is not None:
+            elapsed_ns += now - self._start_perf_ns
+        return elapsed_ns
+
+    def _countdown_remaining(self, elapsed_ns: int) -> float:
+        remaining_ns = self._target_seconds * 1_000_000_000 - elapsed_ns
+        if remaining_ns <= 0:
+            if self._state == TimerState.RUNNING:
+                self._state = TimerState.FINISHED
+                self._start_perf_ns = None
+            return 0.0
+        return remaining_ns / 1_000_000_000
+
 
-def _format_hms(total_seconds: float) -> str:
-    seconds = max(0, int(total_seconds))
-    h = seconds // 3600
-    m = (seconds % 3600) // 60
-    s = seconds % 60
-    return f"{h:02d}:{m:02d}:{s:02d}"
+try:
+    from timer_fmt import format_hms as _format_hms
+except ImportError:
+    _TWO_DIGIT = tuple(f"{i:02d}" for i in range(100))
+
+    @lru_cache(maxsize=4096)
+    def _format_hms(seconds: int) -> str:
+        h, rem = divmod(max(0, seconds), 3600)
+        m, s = divmod(rem, 60)
+        if h >= 100:
+            return f"{h:02d}:{_TWO_DIGIT[m]}:{_TWO_DIGIT[s]}"
+        return f"{_TWO_DIGIT[h]}:{_TWO_DIGIT[m]}:{_TWO_DIGIT[s]}"
 
 
 class FloatingTimerApp:
+    # (mode, state) -> (inputs_state, start_state, stop_state, start_text)
+    _STATE_UI_TABLE: dict[tuple[str, str], tuple[str, str, str, str]] = {
+        (TimerMode.UP, TimerState.IDLE): ("disabled", "normal", "disabled", "开始计时"),
+        (TimerMode.UP, TimerState.RUNNING): ("disabled", "disabled", "normal", "开始计时"),
+        (TimerMode.UP, TimerState.PAUSED): ("disabled", "normal", "disabled", "继续计时"),
+        (TimerMode.UP, TimerState.FINISHED): ("disabled", "normal", "disabled", "开始计时"),
+        (TimerMode.DOWN, TimerState.IDLE): ("normal", "normal", "disabled", "开始计时"),
+        (TimerMode.DOWN, TimerState.RUNNING): ("disabled", "disabled", "normal", "开始计时"),
+        (TimerMode.DOWN, TimerState.PAUSED): ("disabled", "normal", "disabled", "继续计时"),
+        (TimerMode.DOWN, TimerState.FINISHED): ("normal", "normal", "disabled", "开始计时"),
+    }
+
     def __init__(self, root: tk.Tk) -> None:
         self.root = root
         self.model = TimerModel()
+        self._tick_display = self.model.tick_display
 
         self._update_job: str | None = None
         self._flash_job: str | None = None
         self._flash_remaining: int = 0
-        self._drag_offset_x: int | None = None
-        self._drag_offset_y: int | None = None
+        self._drag_root_x: int | None = None
+        self._drag_root_y: int | None = None
+        self._drag_win_x = 0
+        self._drag_win_y = 0
+        self._last_drag_apply_ns = 0
+        self._set_geom = self.root.geometry
+        self._pending_geom: tuple[int, int] | None = None
+        self._drag_flush_job: str | None = None
 
         self._bg = "#1f232a"
         self._fg = "#e6e6e6"
         self._accent = "#3b82f6"
         self._danger = "#b91c1c"
+        self._applied_bg = self._bg
 
-        self._time_text = tk.StringVar(value="00:00:00")
-        self._mode_var = tk.StringVar(value=self.model.mode.value)
+        self._last_shown_seconds: int = -1
+        self._mode_var = tk.StringVar(value=self.model.mode)
         self._hours_var = tk.StringVar(value="0")
         self._minutes_var = tk.StringVar(value="5")
         self._seconds_var = tk.StringVar(value="0")
+        self._entry_ints: dict[str, int] = {}
+        for name, var in (("hours", self._hours_var), ("minutes", self._minutes_var), ("seconds", self._seconds_var)):
+            var.trace_add("write", partial(self._on_entry_changed, name, var))
+            self._on_entry_changed(name, var)
         self._start_text = tk.StringVar(value="开始计时")
+        self._set_start = self._start_text.set
         self._compact = False
         self._restore_geometry: str | None = None
+        self._last_sync_key: tuple[str, str] | None = None
+        self._sync_pending = False
         self._hotkey_values = {
             "toggle": tk.StringVar(value="Space"),
             "compact": tk.StringVar(value="Enter"),
@@ -179,12 +227,19 @@ class FloatingTimerApp:
 
         self.time_label = tk.Label(
             self.top,
-            textvariable=self._time_text,
+            text="00:00:00",
             bg=self._bg,
             fg=self._fg,
             font=("Segoe UI", 24, "bold"),
         )
         self.time_label.pack(side="left", anchor="w")
+        self._set_time = partial(self.root.tk.call, str(self.time_label), "configure", "-text")
+        self.root.tk.call(
+            "proc",
+            "::timer_flash_bg",
+            "bg",
+            f"{self.container} configure -bg $bg; {self.time_label} configure -bg $bg",
+        )
 
         self.close_btn = tk.Button(
             self.top,
@@ -292,8 +347,8 @@ class FloatingTimerApp:
         tk.Label(mode_frame, text="计时模式", bg=self._bg, fg=self._fg).pack(side="left")
         self.mode_up = tk.Radiobutton(
             mode_frame,
-            text=TimerMode.UP.value,
-            value=TimerMode.UP.value,
+            text=TimerMode.UP,
+            value=TimerMode.UP,
             variable=self._mode_var,
             bg=self._bg,
             fg=self._fg,
@@ -306,8 +361,8 @@ class FloatingTimerApp:
         self.mode_up.pack(side="left", padx=(10, 0))
         self.mode_down = tk.Radiobutton(
             mode_frame,
-            text=TimerMode.DOWN.value,
-            value=TimerMode.DOWN.value,
+            text=TimerMode.DOWN,
+            value=TimerMode.DOWN,
             variable=self._mode_var,
             bg=self._bg,
             fg=self._fg,
@@ -402,28 +457,55 @@ class FloatingTimerApp:
             widget.bind("<Return>", self._on_entry_return)
 
     def _on_drag_start(self, event: tk.Event) -> None:
-        self._drag_offset_x = event.x
-        self._drag_offset_y = event.y
+        self._drag_win_x = self.root.winfo_x()
+        self._drag_win_y = self.root.winfo_y()
+        self._drag_root_x = event.x_root
+        self._drag_root_y = event.y_root
 
     def _on_drag_move(self, event: tk.Event) -> None:
-        if self._drag_offset_x is None or self._drag_offset_y is None:
+        if self._drag_root_x is None or self._drag_root_y is None:
             return
-        x = self.root.winfo_x() + (event.x - self._drag_offset_x)
-        y = self.root.winfo_y() + (event.y - self._drag_offset_y)
-        self.root.geometry(f"+{x}+{y}")
+        x = self._drag_win_x + (event.x_root - self._drag_root_x)
+        y = self._drag_win_y + (event.y_root - self._drag_root_y)
+        since_ns = perf_counter_ns() - self._last_drag_apply_ns
+        if since_ns < 6_000_000:
+            self._pending_geom = (x, y)
+            if self._drag_flush_job is None:
+                delay_ms = max(1, (6_000_000 - since_ns) // 1_000_000)
+                self._drag_flush_job = self.root.after(delay_ms, self._flush_drag)
+            return
+        self._apply_drag_geom(x, y)
+
+    def _flush_drag(self) -> None:
+        self._drag_flush_job = None
+        if self._pending_geom is not None:
+            self._apply_drag_geom(*self._pending_geom)
+
+    def _apply_drag_geom(self, x: int, y: int) -> None:
+        self._pending_geom = None
+        self._last_drag_apply_ns = perf_counter_ns()
+        self._set_geom("+%d+%d" % (x, y))
 
     def _on_drag_end(self, _event: tk.Event) -> None:
-        self._drag_offset_x = None
-        self._drag_offset_y = None
+        if self._drag_flush_job is not None:
+            try:
+                self.root.after_cancel(self._drag_flush_job)
+            except Exception:
+                pass
+            self._drag_flush_job = None
+        if self._pending_geom is not None:
+            self._apply_drag_geom(*self._pending_geom)
+        self._drag_root_x = None
+        self._drag_root_y = None
 
     def _on_mode_change(self) -> None:
-        mode = TimerMode.UP if self._mode_var.get() == TimerMode.UP.value else TimerMode.DOWN
+        mode = self._mode_var.get()
         self._stop_flash()
         self._cancel_update_loop()
         self.model.set_mode(mode)
         if mode == TimerMode.DOWN:
             self._apply_countdown()
-        self._sync_ui_from_model()
+        self._schedule_sync()
 
     def _on_entry_return(self, _event: tk.Event) -> str:
         self._apply_countdown()
@@ -578,49 +660,45 @@ class FloatingTimerApp:
             self.time_label.pack_forget()
             self.time_label.pack(side="left", anchor="w")
             self.top.pack_configure(pady=(8, 0))
-        self._sync_ui_from_model()
+        self._schedule_sync()
 
-    def _apply_countdown(self) -> None:
-        try:
-            hours = int(self._hours_var.get() or "0")
-        except ValueError:
-            hours = 0
-        try:
-            minutes = int(self._minutes_var.get() or "0")
-        except ValueError:
-            minutes = 0
+    def _on_entry_changed(self, name: str, var: tk.StringVar, *_args: object) -> None:
         try:
-            seconds = int(self._seconds_var.get() or "0")
+            value = max(0, int(var.get() or "0"))
         except ValueError:
-            seconds = 0
-        total = max(0, hours) * 3600 + max(0, minutes) * 60 + max(0, seconds)
+            value = 0
+        self._entry_ints[name] = value
+
+    def _apply_countdown(self) -> None:
+        ints = self._entry_ints
+        total = ints["hours"] * 3600 + ints["minutes"] * 60 + ints["seconds"]
         self.model.set_target_seconds(total)
         if self.model.mode == TimerMode.DOWN and self.model.state in (TimerState.IDLE, TimerState.FINISHED):
-            self._time_text.set(_format_hms(self.model.target_seconds))
+            self._show_seconds(self.model.target_seconds)
 
     def _on_start(self) -> None:
         self._stop_flash()
         if self.model.mode == TimerMode.DOWN:
             self._apply_countdown()
             if self.model.target_seconds <= 0:
-                self._sync_ui_from_model()
+                self._schedule_sync()
                 return
-        now = perf_counter()
+        now = perf_counter_ns()
         if self.model.state == TimerState.PAUSED:
             self.model.resume(now)
         else:
             self.model.start(now)
         self.root.focus_set()
         self._ensure_update_loop()
-        self._sync_ui_from_model()
+        self._schedule_sync()
 
     def _on_stop(self) -> None:
         self._stop_flash()
-        now = perf_counter()
+        now = perf_counter_ns()
         if self.model.state == TimerState.RUNNING:
             self.model.pause(now)
             self._cancel_update_loop()
-        self._sync_ui_from_model()
+        self._schedule_sync()
 
     def _toggle_start_stop(self) -> None:
         if self.model.state == TimerState.RUNNING:
@@ -632,7 +710,7 @@ class FloatingTimerApp:
         self._stop_flash()
         self._cancel_update_loop()
         self.model.reset()
-        self._sync_ui_from_model()
+        self._schedule_sync()
 
     def _cancel_update_loop(self) -> None:
         if self._update_job is None:
@@ -643,28 +721,31 @@ class FloatingTimerApp:
             pass
         self._update_job = None
 
-    def _ensure_update_loop(self) -> None:
+    def _ensure_update_loop(self, delay_ms: int = 50) -> None:
         if self._update_job is None:
-            self._update_job = self.root.after(50, self._on_update)
+            self._update_job = self.root.after(delay_ms, self._on_update)
 
     def _on_update(self) -> None:
         self._update_job = None
-        snap = self.model.snapshot(perf_counter())
+        mode, state, shown = self._tick_display(perf_counter_ns())
+        up = mode == TimerMode.UP
+        self._show_seconds(shown)
 
-        if snap.mode == TimerMode.UP:
-            self._time_text.set(_format_hms(snap.elapsed_seconds))
-        else:
-            self._time_text.set(_format_hms(snap.remaining_seconds or 0))
+        if state == TimerState.RUNNING:
+            frac = 1.0 - shown % 1.0 if up else shown % 1.0
+            self._ensure_update_loop(max(5, int(frac * 1000) + 2))
+            return
 
-        if snap.mode == TimerMode.DOWN and snap.state == TimerState.FINISHED:
+        if not up and state == TimerState.FINISHED:
             self._start_flash()
-            self._sync_ui_from_model()
-            return
+        self._sync_ui_from_model()
 
-        if snap.state == TimerState.RUNNING:
-            self._ensure_update_loop()
-        else:
-            self._sync_ui_from_model()
+    def _show_seconds(self, total_seconds: float) -> None:
+        secs = max(0, int(total_seconds))
+        if secs == self._last_shown_seconds:
+            return
+        self._last_shown_seconds = secs
+        self._set_time(_format_hms(secs))
 
     def _start_flash(self) -> None:
         if self._flash_job is not None:
@@ -675,14 +756,11 @@ class FloatingTimerApp:
     def _flash_step(self) -> None:
         self._flash_job = None
         if self._flash_remaining <= 0:
-            self.container.configure(bg=self._bg)
-            self.time_label.configure(bg=self._bg)
+            self._apply_bg(self._bg)
             return
         self._flash_remaining -= 1
         is_danger = self._flash_remaining % 2 == 0
-        bg = self._danger if is_danger else self._bg
-        self.container.configure(bg=bg)
-        self.time_label.configure(bg=bg)
+        self._apply_bg(self._danger if is_danger else self._bg)
         self._flash_job = self.root.after(160, self._flash_step)
 
     def _stop_flash(self) -> None:
@@ -693,36 +771,42 @@ class FloatingTimerApp:
                 pass
         self._flash_job = None
         self._flash_remaining = 0
-        self.container.configure(bg=self._bg)
-        self.time_label.configure(bg=self._bg)
+        self._apply_bg(self._bg)
+
+    def _apply_bg(self, bg: str) -> None:
+        if bg == self._applied_bg:
+            return
+        self._applied_bg = bg
+        self.root.tk.call("::timer_flash_bg", bg)
+
+    def _schedule_sync(self) -> None:
+        if self._sync_pending:
+            return
+        self._sync_pending = True
+        self.root.after_idle(self._do_sync)
+
+    def _do_sync(self) -> None:
+        self._sync_pending = False
+        self._sync_ui_from_model()
 
     def _sync_ui_from_model(self) -> None:
         state = self.model.state
         mode = self.model.mode
 
-        if mode == TimerMode.UP:
-            self.hours_entry.configure(state="disabled")
-            self.minutes_entry.configure(state="disabled")
-            self.seconds_entry.configure(state="disabled")
-            self.apply_btn.configure(state="disabled")
-            if state == TimerState.IDLE:
-                self._time_text.set("00:00:00")
-        else:
-            inputs_state = "normal" if state in (TimerState.IDLE, TimerState.FINISHED) else "disabled"
-            self.hours_entry.configure(state=inputs_state)
-            self.minutes_entry.configure(state=inputs_state)
-            self.seconds_entry.configure(state=inputs_state)
-            self.apply_btn.configure(state=inputs_state)
-            if state == TimerState.IDLE:
-                self._time_text.set(_format_hms(self.model.target_seconds))
-
-        if state == TimerState.PAUSED:
-            self._start_text.set("继续计时")
-        else:
-            self._start_text.set("开始计时")
+        if state == TimerState.IDLE:
+            self._show_seconds(0 if mode == TimerMode.UP else self.model.target_seconds)
 
-        start_state = "normal" if state in (TimerState.IDLE, TimerState.PAUSED, TimerState.FINISHED) else "disabled"
-        stop_state = "normal" if state == TimerState.RUNNING else "disabled"
+        key = (mode, state)
+        if key == self._last_sync_key:
+            return
+        self._last_sync_key = key
+
+        inputs_state, start_state, stop_state, start_text = self._STATE_UI_TABLE[key]
+        self.hours_entry.configure(state=inputs_state)
+        self.minutes_entry.configure(state=inputs_state)
+        self.seconds_entry.configure(state=inputs_state)
+        self.apply_btn.configure(state=inputs_state)
+        self._set_start(start_text)
         self.start_btn.configure(state=start_state)
         self.stop_btn.configure(state=stop_state)
 
@@ -0,0 +1,15 @@
+# cython: language_level=3
+from libc.stdio cimport snprintf
+
+
+cpdef str format_hms(long long seconds):
+    cdef char buf[32]
+    cdef long long h, m, s
+    cdef int n
+    if seconds < 0:
+        seconds = 0
+    h = seconds // 3600
+    m = (seconds % 3600) // 60
+    s = seconds % 60
+    n = snprintf(buf, sizeof(buf), b"%02lld:%02lld:%02lld", h, m, s)
+    return buf[:n].decode("ascii")